@@ -34,14 +34,37 @@ from nilearn.plotting import plot_stat_map
 # (e.g., correctly naming an object after hearing its auditory description)
 # while a second group of studies asked children to decide if two (or more)
 # words were semantically related to one another or not.
+#
+# Converting a Sleuth file requires parsing the text file and building the
+# Dataset from scratch, so we save each converted Dataset to disk and reuse it
+# when the example is run again, as long as the Sleuth file has not changed
+# since.
+from nimare.dataset import Dataset
 from nimare.io import convert_sleuth_to_dataset
 from nimare.utils import get_resource_path
 
+out_dir = os.path.abspath("../example_data/")
+os.makedirs(out_dir, exist_ok=True)
+
+
+def load_sleuth_dataset(sleuth_file):
+    """Convert a Sleuth file to a Dataset, reusing a saved version when available."""
+    dset_file = os.path.join(
+        out_dir, os.path.basename(sleuth_file).replace(".txt", "_dataset.pkl.gz")
+    )
+    if os.path.isfile(dset_file) and os.path.getmtime(dset_file) > os.path.getmtime(sleuth_file):
+        return Dataset.load(dset_file)
+
+    dset = convert_sleuth_to_dataset(sleuth_file)
+    dset.save(dset_file)
+    return dset
+
+
 knowledge_file = os.path.join(get_resource_path(), "semantic_knowledge_children.txt")
 related_file = os.path.join(get_resource_path(), "semantic_relatedness_children.txt")
 
-knowledge_dset = convert_sleuth_to_dataset(knowledge_file)
-related_dset = convert_sleuth_to_dataset(related_file)
+knowledge_dset = load_sleuth_dataset(knowledge_file)
+related_dset = load_sleuth_dataset(related_file)
 
 ###############################################################################
 # Individual group ALEs
@@ -49,47 +72,72 @@ related_dset = convert_sleuth_to_dataset(related_file)
 # Computing separate ALE analyses for each group is not strictly necessary for
 # performing the subtraction analysis but will help the experimenter to appreciate the
 # similarities and differences between the groups.
+#
+# The two within-sample meta-analyses are independent of one another, so we run
+# them (and their Monte Carlo FWE corrections) in parallel, with one process per
+# group.
+# Each group gets its own ALE Estimator, since an Estimator retains the inputs
+# and null distributions from the last Dataset it was fitted to.
+#
+# The modeled activation (MA) maps of each Dataset are cached on disk with the
+# ``memory`` parameter, so that the subtraction analysis below can reuse them
+# instead of generating them again.
+import nibabel as nib
+import numpy as np
+from joblib import Parallel, delayed
+
 from nimare.correct import FWECorrector
 from nimare.meta.cbma import ALE
 
-ale = ALE(null_method="approximate")
-knowledge_results = ale.fit(knowledge_dset)
-related_results = ale.fit(related_dset)
-
-corr = FWECorrector(method="montecarlo", voxel_thresh=0.001, n_iters=100, n_cores=2)
-knowledge_corrected_results = corr.transform(knowledge_results)
-related_corrected_results = corr.transform(related_results)
-
-fig, axes = plt.subplots(figsize=(12, 10), nrows=2)
-knowledge_img = knowledge_corrected_results.get_map(
-    "z_desc-size_level-cluster_corr-FWE_method-montecarlo"
+cache_dir = os.path.join(out_dir, "nimare_cache")
+knowledge_results, related_results = Parallel(n_jobs=2)(
+    delayed(ALE(null_method="approximate", memory=cache_dir, memory_level=1).fit)(dset)
+    for dset in (knowledge_dset, related_dset)
 )
-plot_stat_map(
-    knowledge_img,
-    cut_coords=4,
-    display_mode="z",
-    title="Semantic knowledge",
-    threshold=2.326,  # cluster-level p < .01, one-tailed
-    cmap="RdBu_r",
-    vmax=4,
-    axes=axes[0],
-    figure=fig,
+
+# Both corrections already run in parallel, so each one uses a single core.
+corr = FWECorrector(method="montecarlo", voxel_thresh=0.001, n_iters=100, n_cores=1)
+knowledge_corrected_results, related_corrected_results = Parallel(n_jobs=2)(
+    delayed(corr.transform)(result) for result in (knowledge_results, related_results)
 )
 
-related_img = related_corrected_results.get_map(
-    "z_desc-size_level-cluster_corr-FWE_method-montecarlo"
+
+def get_float32_map(result, name):
+    """Get a map from a MetaResult as a single-precision image.
+
+    The z-statistics are well within float32 range, so there is no need to carry
+    float64 data through the conjunction and plotting steps below.
+    """
+    img = result.get_map(name)
+    img = nib.Nifti1Image(img.get_fdata(dtype=np.float32), img.affine, img.header)
+    img.header.set_data_dtype(np.float32)
+    return img
+
+
+knowledge_img = get_float32_map(
+    knowledge_corrected_results, "z_desc-size_level-cluster_corr-FWE_method-montecarlo"
 )
-plot_stat_map(
-    related_img,
-    cut_coords=4,
-    display_mode="z",
-    title="Semantic relatedness",
-    threshold=2.326,  # cluster-level p < .01, one-tailed
-    cmap="RdBu_r",
-    vmax=4,
-    axes=axes[1],
-    figure=fig,
+related_img = get_float32_map(
+    related_corrected_results, "z_desc-size_level-cluster_corr-FWE_method-montecarlo"
 )
+
+fig, axes = plt.subplots(figsize=(12, 10), nrows=2)
+for ax, img, title in zip(
+    axes,
+    (knowledge_img, related_img),
+    ("Semantic knowledge", "Semantic relatedness"),
+):
+    plot_stat_map(
+        img,
+        cut_coords=4,
+        display_mode="z",
+        title=title,
+        threshold=2.326,  # cluster-level p < .01, one-tailed
+        cmap="RdBu_r",
+        vmax=4,
+        axes=ax,
+        figure=fig,
+    )
 fig.show()
 
 ###############################################################################
@@ -142,12 +190,15 @@ related_jackknife_table.head(10)
 # However, we have reduced this to 100 iterations for this example.
 # Similarly here we use a voxel-level z-threshold of 0.01, but in practice one would
 # use a more stringent threshold (e.g., 1.65).
+#
+# With ``memory_level=2``, the permutation-based p-values are cached along with the MA
+# maps, so rebuilding this example with the same Datasets skips the permutations.
 from nimare.meta.cbma import ALESubtraction
 from nimare.reports.base import run_reports
 from nimare.workflows import PairwiseCBMAWorkflow
 
 workflow = PairwiseCBMAWorkflow(
-    estimator=ALESubtraction(n_iters=10, n_cores=1),
+    estimator=ALESubtraction(n_iters=10, n_cores=1, memory=cache_dir, memory_level=2),
     corrector="fdr",
     diagnostics=FocusCounter(voxel_thresh=0.01, display_second_group=True),
 )
@@ -179,12 +230,16 @@ run_reports(res_sub, html_dir)
 # in *both* individual group maps and (b) selecting, for each of these voxels,
 # the smaller of the two group-specific *z* values :footcite:t:`nichols2005valid`.
 # Since this is simple arithmetic on images, conjunction is not implemented as
-# a separate method in :code:`NiMARE` but can easily be achieved with
-# :func:`nilearn.image.math_img`.
-from nilearn.image import math_img
-
-formula = "np.where(img1 * img2 > 0, np.minimum(img1, img2), 0)"
-img_conj = math_img(formula, img1=knowledge_img, img2=related_img)
+# a separate method in :code:`NiMARE` but can easily be achieved with NumPy,
+# operating directly on the (single-precision) image data arrays.
+knowledge_data = knowledge_img.get_fdata(dtype=np.float32)
+related_data = related_img.get_fdata(dtype=np.float32)
+conj_data = np.where(
+    (np.sign(knowledge_data) == np.sign(related_data)) & (knowledge_data != 0),
+    np.sign(knowledge_data) * np.minimum(np.abs(knowledge_data), np.abs(related_data)),
+    0,
+)
+img_conj = nib.Nifti1Image(conj_data, knowledge_img.affine, knowledge_img.header)
 
 plot_stat_map(
     img_conj,
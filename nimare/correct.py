@@ -275,6 +275,12 @@ class FWECorrector(Corrector):
     Estimators have special methods following the naming convention
     ``correct_[correction-type]_[method]``
     (e.g., :func:`~nimare.meta.cbma.ale.ALE.correct_fwe_montecarlo`).
+
+    The ``montecarlo`` method simulates new null distributions on every call to
+    :meth:`transform`, from NumPy's global random state.
+    To reuse the null distributions from a previous correction of the same Estimator, with the
+    same parameters, pass them explicitly with the ``null_distributions`` keyword argument
+    (e.g., ``null_distributions=corrected_result.estimator.null_distributions_``).
     """
 
     _correction_method = "fwe"
@@ -8,10 +8,10 @@ import pandas as pd
 from joblib import Parallel, delayed
 from nilearn import input_data
 from nilearn.reporting import get_clusters_table
-from scipy.spatial.distance import cdist
 from tqdm.auto import tqdm
 
 from nimare.base import NiMAREBase
+from nimare.meta.cbma.ale import ALE
 from nimare.meta.cbma.base import PairwiseCBMAEstimator
 from nimare.meta.ibma import IBMAEstimator
 from nimare.utils import _check_ncores, get_masker, mm2vox, tqdm_joblib
@@ -20,6 +20,8 @@ LGR = logging.getLogger(__name__)
 
 POSTAIL_LBL = "PositiveTail"  # Label assigned to positive tail clusters
 NEGTAIL_LBL = "NegativeTail"  # Label assigned to negative tail clusters
+# Columns of the clusters table returned by nilearn's get_clusters_table
+CLUSTERS_TABLE_COLS = ["Cluster ID", "X", "Y", "Z", "Peak Stat", "Cluster Size (mm3)"]
 
 
 class Diagnostics(NiMAREBase):
@@ -136,14 +138,22 @@ class Diagnostics(NiMAREBase):
 
         # Get clusters table and label maps
         stat_threshold = self.voxel_thresh or 0
-        two_sided = (target_img.get_fdata() < 0).any()
-        clusters_table, label_maps = get_clusters_table(
-            target_img,
-            stat_threshold,
-            self.cluster_threshold,
-            two_sided=two_sided,
-            return_label_maps=True,
-        )
+        target_data = target_img.get_fdata()
+        two_sided = (target_data < 0).any()
+        suprathreshold = np.abs(target_data) if two_sided else target_data
+        if not (suprathreshold > stat_threshold).any():
+            # Skip cluster labeling when no voxels survive the threshold
+            clusters_table = pd.DataFrame(columns=CLUSTERS_TABLE_COLS)
+            label_maps = []
+        else:
+            clusters_table, label_maps = get_clusters_table(
+                target_img,
+                stat_threshold,
+                self.cluster_threshold,
+                two_sided=two_sided,
+                return_label_maps=True,
+            )
+        del target_data, suprathreshold
 
         n_clusters = clusters_table.shape[0]
         if n_clusters == 0:
@@ -254,6 +264,8 @@ class Jackknife(Diagnostics):
     .. versionchanged:: 0.1.2
 
         * Support for pairwise meta-analyses.
+        * Derive leave-one-out ALE values from the original ALE values instead of refitting
+          :class:`~nimare.meta.cbma.ale.ALE` Estimators.
 
     .. versionchanged:: 0.0.14
 
@@ -273,8 +285,42 @@ class Jackknife(Diagnostics):
     statistic for all experiments *except* the target experiment, dividing the resulting test
     summary statistics by the summary statistics from the original meta-analysis, and finally
     averaging the resulting proportion values across all voxels in each cluster.
+
+    For :class:`~nimare.meta.cbma.ale.ALE` meta-analyses, the Estimator does not need to be
+    refitted. Since ALE values are computed as :math:`1 - \\prod_{i}(1 - MA_{i})`, the ALE values
+    without the target experiment :math:`j` are :math:`1 - (1 - ALE) / (1 - MA_{j})`.
     """
 
+    def _leave_one_out_ale(self, estimator, expid, stat_values):
+        """Compute ALE values without one study, from the ALE values with all studies.
+
+        Parameters
+        ----------
+        estimator : :obj:`~nimare.meta.cbma.ale.ALE`
+            The fitted ALE Estimator.
+        expid : :obj:`str`
+            ID of the study to leave out.
+        stat_values : 1D :obj:`numpy.ndarray`
+            ALE values from all studies.
+
+        Returns
+        -------
+        1D :obj:`numpy.ndarray`
+            ALE values from all studies except ``expid``.
+        """
+        coordinates = estimator.inputs_["coordinates"]
+        ma_values = estimator.kernel_transformer.transform(
+            coordinates.loc[coordinates["id"] == expid],
+            masker=estimator.masker,
+            return_type="array",
+        )
+
+        # Keep values away from 1 to avoid taking the log of 0
+        eps = np.finfo(float).eps
+        log_ale = np.log1p(-np.minimum(stat_values, 1 - eps))
+        log_ma = np.log1p(-np.minimum(np.squeeze(ma_values, axis=0), 1 - eps))
+        return -np.expm1(log_ale - log_ma)
+
     def _transform(self, expid, label_map, sign, result):
         """Apply transform to study ID and label map.
 
@@ -294,16 +340,7 @@ class Jackknife(Diagnostics):
         stat_prop_values : 1D :obj:`numpy.ndarray`
             1D array with the contribution of `expid` in each cluster of `label_map`.
         """
-        # We need to copy the estimator because it will otherwise overwrite the original version
-        # with one missing a study in its inputs.
-        estimator = copy.deepcopy(result.estimator)
-
-        if self._is_pairwaise_estimator:
-            all_ids = estimator.inputs_["id1"] if sign == POSTAIL_LBL else estimator.inputs_["id2"]
-        else:
-            all_ids = estimator.inputs_["id"]
-
-        original_masker = estimator.masker
+        original_masker = result.estimator.masker
 
         # Mask using a labels masker, so that we can easily get the mean value for each cluster
         cluster_masker = input_data.NiftiLabelsMasker(label_map)
@@ -319,22 +356,36 @@ class Jackknife(Diagnostics):
 
         stat_values = result.get_map(target_value_map, return_type="array")
 
-        # Fit Estimator to all studies except the target study
-        other_ids = [id_ for id_ in all_ids if id_ != expid]
-        if self._is_pairwaise_estimator:
-            if sign == POSTAIL_LBL:
-                temp_dset = estimator.dataset1.slice(other_ids)
-                temp_result = estimator.fit(temp_dset, estimator.dataset2)
-            else:
-                temp_dset = estimator.dataset2.slice(other_ids)
-                temp_result = estimator.fit(estimator.dataset1, temp_dset)
+        if isinstance(result.estimator, ALE) and target_value_map == "stat":
+            temp_stat_vals = self._leave_one_out_ale(result.estimator, expid, stat_values)
         else:
-            temp_dset = estimator.dataset.slice(other_ids)
-            temp_result = estimator.fit(temp_dset)
+            # We need to copy the estimator because it will otherwise overwrite the original
+            # version with one missing a study in its inputs.
+            estimator = copy.deepcopy(result.estimator)
+
+            if self._is_pairwaise_estimator:
+                all_ids = (
+                    estimator.inputs_["id1"] if sign == POSTAIL_LBL else estimator.inputs_["id2"]
+                )
+            else:
+                all_ids = estimator.inputs_["id"]
+
+            # Fit Estimator to all studies except the target study
+            other_ids = [id_ for id_ in all_ids if id_ != expid]
+            if self._is_pairwaise_estimator:
+                if sign == POSTAIL_LBL:
+                    temp_dset = estimator.dataset1.slice(other_ids)
+                    temp_result = estimator.fit(temp_dset, estimator.dataset2)
+                else:
+                    temp_dset = estimator.dataset2.slice(other_ids)
+                    temp_result = estimator.fit(estimator.dataset1, temp_dset)
+            else:
+                temp_dset = estimator.dataset.slice(other_ids)
+                temp_result = estimator.fit(temp_dset)
 
-        # Collect the target values (e.g., ALE values) from the N-1 meta-analysis
-        temp_stat_img = temp_result.get_map(target_value_map, return_type="image")
-        temp_stat_vals = np.squeeze(original_masker.transform(temp_stat_img))
+            # Collect the target values (e.g., ALE values) from the N-1 meta-analysis
+            temp_stat_img = temp_result.get_map(target_value_map, return_type="image")
+            temp_stat_vals = np.squeeze(original_masker.transform(temp_stat_img))
 
         # Voxelwise proportional reduction of each statistic after removal of the experiment
         with np.errstate(divide="ignore", invalid="ignore"):
@@ -354,6 +405,8 @@ class FocusCounter(Diagnostics):
     .. versionchanged:: 0.1.2
 
         * Support for pairwise meta-analyses.
+        * Count foci by looking up the cluster label at each focus, instead of computing
+          distances to every voxel in each cluster.
 
     .. versionchanged:: 0.0.14
 
@@ -400,8 +453,8 @@ class FocusCounter(Diagnostics):
             raise ValueError("This method only works for coordinate-based meta-analyses.")
 
         affine = label_map.affine
-        label_arr = label_map.get_fdata()
-        clust_ids = sorted(list(np.unique(label_arr)[1:]))
+        label_arr = np.asanyarray(label_map.dataobj)
+        clust_ids = np.unique(label_arr)[1:]
 
         if self._is_pairwaise_estimator:
             coordinates_df = (
@@ -415,17 +468,13 @@ class FocusCounter(Diagnostics):
         coords = coordinates_df.loc[coordinates_df["id"] == expid]
         ijk = mm2vox(coords[["x", "y", "z"]], affine)
 
-        focus_counts = []
-        for c_val in clust_ids:
-            cluster_mask = label_arr == c_val
-            cluster_idx = np.vstack(np.where(cluster_mask))
-            distances = cdist(cluster_idx.T, ijk)
-            distances = distances < 1
-            distances = np.any(distances, axis=0)
-            n_included_voxels = np.sum(distances)
-            focus_counts.append(n_included_voxels)
-
-        return np.array(focus_counts)
+        # Foci are converted to integer voxel indices, so a focus falls within a cluster if the
+        # label map has the cluster's value at the focus' voxel.
+        in_bounds = np.all((ijk >= 0) & (ijk < label_arr.shape), axis=1)
+        focus_labels = label_arr[tuple(ijk[in_bounds].T)]
+        focus_counts = np.sum(focus_labels[:, None] == clust_ids[None, :], axis=0)
+
+        return focus_counts
 
 
 class FocusFilter(NiMAREBase):
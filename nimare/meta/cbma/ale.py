@@ -5,14 +5,16 @@ import numpy as np
 import pandas as pd
 import sparse
 from joblib import Parallel, delayed
+from scipy import sparse as sp_sparse
 from tqdm.auto import tqdm
 
 from nimare import _version
 from nimare.meta.cbma.base import CBMAEstimator, PairwiseCBMAEstimator
 from nimare.meta.kernel import ALEKernel
+from nimare.meta.utils import _sparse_ale, _sparse_to_masked_log_complement
 from nimare.stats import null_to_p, nullhist_to_p
 from nimare.transforms import p_to_z
-from nimare.utils import _check_ncores, tqdm_joblib, use_memmap
+from nimare.utils import _check_ncores, _determine_chunk_size, tqdm_joblib, use_memmap
 
 LGR = logging.getLogger(__name__)
 __version__ = _version.get_versions()["version"]
@@ -62,7 +64,7 @@ class ALE(CBMAEstimator):
     **kwargs
         Keyword arguments. Arguments for the kernel_transformer can be assigned here,
         with the prefix ``kernel__`` in the variable name.
-        Another optional argument is ``mask``.
+        Other optional arguments are ``mask``, ``memory``, and ``memory_level``.
 
     Attributes
     ----------
@@ -187,18 +189,17 @@ class ALE(CBMAEstimator):
         return description
 
     def _compute_summarystat_est(self, ma_values):
-        stat_values = 1.0 - np.prod(1.0 - ma_values, axis=0)
-
         # np.array type is used by _determine_histogram_bins to calculate max_poss_ale
-        if isinstance(stat_values, sparse._coo.core.COO):
+        if isinstance(ma_values, sparse._coo.core.COO):
             # NOTE: This may not work correctly with a non-NiftiMasker.
             mask_data = self.masker.mask_img.get_fdata().astype(bool)
 
-            stat_values = stat_values.todense().reshape(-1)  # Indexing a .reshape(-1) is faster
-            stat_values = stat_values[mask_data.reshape(-1)]
+            stat_values = _sparse_ale(ma_values, mask_data)
 
             # This is used by _compute_null_approximate
             self.__n_mask_voxels = stat_values.shape[0]
+        else:
+            stat_values = 1.0 - np.prod(1.0 - ma_values, axis=0)
 
         return stat_values
 
@@ -307,6 +308,15 @@ class ALE(CBMAEstimator):
 class ALESubtraction(PairwiseCBMAEstimator):
     """ALE subtraction analysis.
 
+    .. versionchanged:: 0.1.2
+
+        - Compute the permutation-based null distribution in chunks of iterations, using
+          sparse matrix products in log space. The observed ALE-difference scores are computed
+          the same way, with exact sums, so that they tie exactly with permuted scores.
+        - Cache the permutation-based p-values when ``memory_level`` is at least 2.
+        - Compute voxel-wise p-values in vectorized chunks of voxels.
+        - Add ``device`` parameter to run the permutations on a GPU with CuPy.
+
     .. versionchanged:: 0.0.12
 
         - Use memmapped array for null distribution and remove ``memory_limit`` parameter.
@@ -334,9 +344,17 @@ class ALESubtraction(PairwiseCBMAEstimator):
         Default is 1.
 
         .. versionadded:: 0.0.12
+    device : {"cpu", "cuda"}, optional
+        Device on which the permutations are run. If "cuda", the permutations are run
+        sequentially on the GPU with CuPy, and ``n_cores`` is ignored. If CuPy or a CUDA device
+        is not available, the CPU is used instead.
+        Default is "cpu".
+
+        .. versionadded:: 0.1.2
     **kwargs
         Keyword arguments. Arguments for the kernel_transformer can be assigned here,
-        with the prefix ``kernel__`` in the variable name. Another optional argument is ``mask``.
+        with the prefix ``kernel__`` in the variable name.
+        Other optional arguments are ``mask``, ``memory``, and ``memory_level``.
 
     Attributes
     ----------
@@ -357,6 +375,11 @@ class ALESubtraction(PairwiseCBMAEstimator):
     The voxel-wise null distributions used by this Estimator are very large, so they are not
     retained as Estimator attributes.
 
+    Memory use is driven by three arrays. The ``log(1 - MA)`` values of both groups are kept as
+    a sparse array, with one value per non-zero MA value, like the MA maps themselves.
+    The null distributions are written to a memory-mapped array of shape (n_iters, n_voxels).
+    Permutations are run in chunks of iterations, whose size is bounded by ``memory_limit``.
+
     Warnings
     --------
     This implementation contains one key difference from the original version.
@@ -373,7 +396,14 @@ class ALESubtraction(PairwiseCBMAEstimator):
     .. footbibliography::
     """
 
-    def __init__(self, kernel_transformer=ALEKernel, n_iters=10000, n_cores=1, **kwargs):
+    def __init__(
+        self,
+        kernel_transformer=ALEKernel,
+        n_iters=10000,
+        n_cores=1,
+        device="cpu",
+        **kwargs,
+    ):
         if not (isinstance(kernel_transformer, ALEKernel) or kernel_transformer == ALEKernel):
             LGR.warning(
                 f"The KernelTransformer being used ({kernel_transformer}) is not optimized "
@@ -388,6 +418,16 @@ class ALESubtraction(PairwiseCBMAEstimator):
         self.dataset2 = None
         self.n_iters = n_iters
         self.n_cores = _check_ncores(n_cores)
+        self.device = device
+        if self.device == "cuda":
+            try:
+                import cupy as cp
+
+                cp.cuda.runtime.getDeviceCount()
+            except (ImportError, RuntimeError):
+                LGR.warning("CuPy or a CUDA device not found, use device 'cpu'.")
+                self.device = "cpu"
+
         # memory_limit needs to exist to trigger use_memmap decorator, but it will also be used if
         # a Dataset with pre-generated MA maps is provided.
         self.memory_limit = "100mb"
@@ -456,51 +496,124 @@ class ALESubtraction(PairwiseCBMAEstimator):
             coords_key="coordinates2",
         )
 
-        # Get ALE values for the two groups and difference scores
-        grp1_ale_values = self._compute_summarystat_est(ma_maps1)
-        grp2_ale_values = self._compute_summarystat_est(ma_maps2)
-        diff_ale_values = grp1_ale_values - grp2_ale_values
-        del grp1_ale_values, grp2_ale_values
-
         n_grp1 = ma_maps1.shape[0]
-        n_voxels = diff_ale_values.shape[0]
 
         # Combine the MA maps into a single array to draw from for null distribution
         ma_arr = sparse.concatenate((ma_maps1, ma_maps2))
 
         del ma_maps1, ma_maps2
 
+        # The ALE product becomes a sum in log space, so the ALE values of any group assignment
+        # can be computed with a (sparse) matrix product, for many permutations at once.
+        # NOTE: This may not work correctly with a non-NiftiMasker.
+        mask_data = self.masker.mask_img.get_fdata().astype(bool)
+        log_ma_arr = _sparse_to_masked_log_complement(ma_arr, mask_data)
+
+        del ma_arr
+
+        # Get the observed difference scores with the same arithmetic as the permuted ones.
+        # Voxels with few contributing experiments have many exact ties in their null
+        # distributions, so the two must be bit-identical for the p-values to be correct.
+        obs_assignments = np.zeros((1, log_ma_arr.shape[0]))
+        obs_assignments[0, :n_grp1] = 1
+        diff_ale_values = self._compute_alediff(obs_assignments, log_ma_arr)[0]
+
+        # Calculate null distribution for each voxel based on group-assignment randomization.
+        # The permutations are deterministic, so the results can be cached for identical inputs.
+        compute_null_p = self._cache(
+            self._compute_alediff_null_p,
+            func_memory_level=2,
+            ignore=["self"],
+        )
+        p_values, diff_signs = compute_null_p(log_ma_arr, n_grp1, diff_ale_values, self.n_iters)
+
+        del log_ma_arr
+
+        z_arr = p_to_z(p_values, tail="two") * diff_signs
+        logp_arr = -np.log10(p_values)
+
+        maps = {
+            "stat_desc-group1MinusGroup2": diff_ale_values,
+            "p_desc-group1MinusGroup2": p_values,
+            "z_desc-group1MinusGroup2": z_arr,
+            "logp_desc-group1MinusGroup2": logp_arr,
+        }
+        description = self._generate_description()
+
+        return maps, {}, description
+
+    def _compute_alediff_null_p(self, log_ma_arr, n_grp1, diff_ale_values, n_iters):
+        """Compute p-values for ALE-difference scores from group-assignment permutations.
+
+        .. versionadded:: 0.1.2
+
+        Parameters
+        ----------
+        log_ma_arr : :obj:`scipy.sparse.csc_matrix` of shape (S, V)
+            Log-transformed complements of the MA values (i.e., ``log(1 - MA)``) for all studies
+            from both groups, with the studies from the first group first.
+            See :func:`~nimare.meta.utils._sparse_to_masked_log_complement`.
+        n_grp1 : :obj:`int`
+            Number of studies in the first group.
+        diff_ale_values : :obj:`numpy.ndarray` of shape (V,)
+            Observed ALE-difference scores.
+        n_iters : :obj:`int`
+            Number of permutations.
+
+        Returns
+        -------
+        p_values : :obj:`numpy.ndarray` of shape (V,)
+            Two-sided p-values of the ALE-difference scores.
+        diff_signs : :obj:`numpy.ndarray` of shape (V,)
+            Signs of the ALE-difference scores, relative to the median of the null distributions.
+        """
+        n_voxels = diff_ale_values.shape[0]
+
         # Calculate null distribution for each voxel based on group-assignment randomization
         # Use a memmapped 2D array
         iter_diff_values = np.memmap(
             self.memmap_filenames[2],
-            dtype=ma_arr.dtype,
+            dtype=diff_ale_values.dtype,
             mode="w+",
-            shape=(self.n_iters, n_voxels),
+            shape=(n_iters, n_voxels),
         )
 
-        with tqdm_joblib(tqdm(total=self.n_iters)):
-            Parallel(n_jobs=self.n_cores)(
-                delayed(self._run_permutation)(i_iter, n_grp1, ma_arr, iter_diff_values)
-                for i_iter in range(self.n_iters)
-            )
+        # Each chunk of permutations produces five (n_chunk_iters, V) arrays: the two group
+        # assignments' log sums, their exponentials, and the difference scores
+        chunk_size = _determine_chunk_size(self.memory_limit, diff_ale_values, multiplier=1 / 5)
+        iter_chunks = np.array_split(np.arange(n_iters), int(np.ceil(n_iters / chunk_size)))
 
-        # Determine p-values based on voxel-wise null distributions
-        # I know that joblib probably preserves order of outputs, but I'm paranoid, so we track
-        # the iteration as well and sort the resulting p-value array based on that.
-        with tqdm_joblib(tqdm(total=n_voxels)):
-            p_values, voxel_idx = zip(
-                *Parallel(n_jobs=self.n_cores)(
-                    delayed(self._alediff_to_p_voxel)(
-                        i_voxel,
-                        diff_ale_values[i_voxel],
-                        iter_diff_values[:, i_voxel],
-                    )
-                    for i_voxel in range(n_voxels)
+        if self.device == "cuda":
+            from cupyx.scipy import sparse as cp_sparse
+
+            # Upload the log-MA values once and run the chunks of permutations one after another
+            log_ma_arr = cp_sparse.csc_matrix(log_ma_arr)
+            for iter_idx in tqdm(iter_chunks):
+                self._run_permutations(iter_idx, n_grp1, log_ma_arr, iter_diff_values)
+
+            del log_ma_arr
+        else:
+            with tqdm_joblib(tqdm(total=len(iter_chunks))):
+                Parallel(n_jobs=self.n_cores)(
+                    delayed(self._run_permutations)(iter_idx, n_grp1, log_ma_arr, iter_diff_values)
+                    for iter_idx in iter_chunks
                 )
+
+        # Determine p-values based on voxel-wise null distributions, in chunks of voxels.
+        # In cases with differently-sized groups, the ALE-difference values will be biased and
+        # skewed, but the null distributions will be too, so symmetric should be False.
+        chunk_size = _determine_chunk_size(
+            self.memory_limit, iter_diff_values[:, 0], multiplier=1 / 3
+        )
+        p_values = np.empty(n_voxels)
+        for start in range(0, n_voxels, chunk_size):
+            chunk = slice(start, start + chunk_size)
+            p_values[chunk] = null_to_p(
+                diff_ale_values[chunk],
+                iter_diff_values[:, chunk],
+                tail="two",
+                symmetric=False,
             )
-        # Convert to an array and sort the p-values array based on the voxel index.
-        p_values = np.array(p_values)[np.array(voxel_idx)]
 
         diff_signs = np.sign(diff_ale_values - np.median(iter_diff_values, axis=0))
 
@@ -510,18 +623,7 @@ class ALESubtraction(PairwiseCBMAEstimator):
 
         del iter_diff_values
 
-        z_arr = p_to_z(p_values, tail="two") * diff_signs
-        logp_arr = -np.log10(p_values)
-
-        maps = {
-            "stat_desc-group1MinusGroup2": diff_ale_values,
-            "p_desc-group1MinusGroup2": p_values,
-            "z_desc-group1MinusGroup2": z_arr,
-            "logp_desc-group1MinusGroup2": logp_arr,
-        }
-        description = self._generate_description()
-
-        return maps, {}, description
+        return p_values, diff_signs
 
     def _compute_summarystat_est(self, ma_values):
         stat_values = 1.0 - np.prod(1.0 - ma_values, axis=0)
@@ -535,40 +637,78 @@ class ALESubtraction(PairwiseCBMAEstimator):
 
         return stat_values
 
-    def _run_permutation(self, i_iter, n_grp1, ma_arr, iter_diff_values):
-        """Run a single permutations of the ALESubtraction null distribution procedure.
+    def _run_permutations(self, iter_idx, n_grp1, log_ma_arr, iter_diff_values):
+        """Run a chunk of permutations of the ALESubtraction null distribution procedure.
 
-        This method writes out a single row to the memmapped array in ``iter_diff_values``.
+        This method writes out one row per iteration to the memmapped array in
+        ``iter_diff_values``.
 
         Parameters
         ----------
-        i_iter : :obj:`int`
-            The iteration number.
+        iter_idx : :obj:`numpy.ndarray` of shape (P,)
+            The iteration numbers of the permutations in this chunk.
         n_grp1 : :obj:`int`
             The number of experiments in the first group (of two, total).
-        ma_arr : :obj:`numpy.ndarray` of shape (E, V)
-            The voxel-wise (V) modeled activation values for all experiments E.
+        log_ma_arr : :obj:`scipy.sparse.csc_matrix` of shape (E, V)
+            The log of one minus the voxel-wise (V) modeled activation values for all
+            experiments E. A :obj:`cupyx.scipy.sparse.csc_matrix` if ``device`` is "cuda".
         iter_diff_values : :obj:`numpy.memmap` of shape (I, V)
             The null distribution of ALE-difference scores, with one row per iteration (I)
             and one column per voxel (V).
         """
-        gen = np.random.default_rng(seed=i_iter)
-        id_idx = np.arange(ma_arr.shape[0])
-        gen.shuffle(id_idx)
-        iter_grp1_ale_values = self._compute_summarystat_est(ma_arr[id_idx[:n_grp1], :])
-        iter_grp2_ale_values = self._compute_summarystat_est(ma_arr[id_idx[n_grp1:], :])
-        iter_diff_values[i_iter, :] = iter_grp1_ale_values - iter_grp2_ale_values
+        n_exps = log_ma_arr.shape[0]
 
-    def _alediff_to_p_voxel(self, i_voxel, stat_value, voxel_null):
-        """Compute one voxel's p-value from its specific null distribution.
+        # Group-assignment matrix, with ones for experiments assigned to the first group
+        grp1_assignments = np.zeros((len(iter_idx), n_exps))
+        for i_row, i_iter in enumerate(iter_idx):
+            gen = np.random.default_rng(seed=i_iter)
+            grp1_assignments[i_row, gen.permutation(n_exps)[:n_grp1]] = 1
 
-        Notes
-        -----
-        In cases with differently-sized groups, the ALE-difference values will be biased and
-        skewed, but the null distributions will be too, so symmetric should be False.
+        iter_diff_values[iter_idx, :] = self._compute_alediff(grp1_assignments, log_ma_arr)
+
+    def _compute_alediff(self, grp1_assignments, log_ma_arr):
+        """Compute ALE-difference scores for group assignments of the experiments.
+
+        Both the observed ALE-difference scores and the permutation-based null distributions
+        are computed with this method. The sums of the log values are exact (see
+        :func:`~nimare.meta.utils._sparse_to_masked_log_complement`), so any two group
+        assignments that agree on the experiments contributing to a voxel produce bit-identical
+        scores at that voxel.
+
+        .. versionadded:: 0.1.2
+
+        Parameters
+        ----------
+        grp1_assignments : :obj:`numpy.ndarray` of shape (P, E)
+            Group assignments, with ones for the experiments assigned to the first group.
+        log_ma_arr : :obj:`scipy.sparse.csc_matrix` of shape (E, V)
+            The log of one minus the voxel-wise (V) modeled activation values for all
+            experiments E. A :obj:`cupyx.scipy.sparse.csc_matrix` if the products should be
+            computed on the GPU.
+
+        Returns
+        -------
+        diff_values : :obj:`numpy.ndarray` of shape (P, V)
+            ALE-difference scores (group 1 minus group 2) for each group assignment.
         """
-        p_value = null_to_p(stat_value, voxel_null, tail="two", symmetric=False)
-        return p_value, i_voxel
+        on_gpu = not sp_sparse.issparse(log_ma_arr)
+        if on_gpu:
+            import cupy as cp
+
+            grp1_assignments = cp.asarray(grp1_assignments)
+
+        # Products are computed as (sparse @ dense).T, which both SciPy and CuPy support
+        log_ma_arr_t = log_ma_arr.T
+        grp1_log_values = (log_ma_arr_t @ grp1_assignments.T).T
+        grp2_log_values = (log_ma_arr_t @ (1 - grp1_assignments).T).T
+
+        if on_gpu:
+            # Exponentials are evaluated on the CPU, like those of the observed scores
+            grp1_log_values = cp.asnumpy(grp1_log_values)
+            grp2_log_values = cp.asnumpy(grp2_log_values)
+
+        # ALE = 1 - exp(sum(log(1 - MA))), so ALE1 - ALE2 = exp(log_grp2) - exp(log_grp1)
+        return np.exp(grp2_log_values) - np.exp(grp1_log_values)
 
     def correct_fwe_montecarlo(self):
         """Perform Monte Carlo-based FWE correction.
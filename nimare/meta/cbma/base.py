@@ -6,7 +6,8 @@ import nibabel as nib
 import numpy as np
 import pandas as pd
 import sparse
-from joblib import Parallel, delayed
+from joblib import Memory, Parallel, delayed
+from nilearn._utils import CacheMixin
 from nilearn.input_data import NiftiMasker
 from scipy import ndimage
 from tqdm.auto import tqdm
@@ -30,9 +31,13 @@ from nimare.utils import (
 LGR = logging.getLogger(__name__)
 
 
-class CBMAEstimator(Estimator):
+class CBMAEstimator(Estimator, CacheMixin):
     """Base class for coordinate-based meta-analysis methods.
 
+    .. versionchanged:: 0.1.2
+
+        * New parameters: ``memory`` and ``memory_level`` for caching modeled activation maps.
+
     .. versionchanged:: 0.0.12
 
         * Remove *low_memory* option
@@ -52,6 +57,21 @@ class CBMAEstimator(Estimator):
     kernel_transformer : :obj:`~nimare.meta.kernel.KernelTransformer`, optional
         Kernel with which to convolve coordinates from dataset. Default is
         ALEKernel.
+    memory : instance of :class:`joblib.Memory`, :obj:`str`, or :class:`pathlib.Path`, optional
+        Used to cache the modeled activation maps generated by the kernel transformer.
+        By default, no caching is done. If a :obj:`str` is given, it is the path to the
+        caching directory. Estimators sharing the same cache will reuse the MA maps of any
+        Dataset they have in common.
+
+        .. versionadded:: 0.1.2
+    memory_level : :obj:`int`, optional
+        Rough estimator of the amount of memory used by caching.
+        Higher value means more memory for caching.
+        Zero means no caching. A level of 1 caches the modeled activation maps.
+        Some Estimators cache more expensive steps (e.g., permutations) at level 2.
+        Default is 0.
+
+        .. versionadded:: 0.1.2
     *args
         Optional arguments to the :obj:`~nimare.base.Estimator` __init__
         (called automatically).
@@ -64,10 +84,20 @@ class CBMAEstimator(Estimator):
     # An individual CBMAEstimator may override this.
     _required_inputs = {"coordinates": ("coordinates", None)}
 
-    def __init__(self, kernel_transformer, *, mask=None, **kwargs):
+    def __init__(
+        self,
+        kernel_transformer,
+        *,
+        mask=None,
+        memory=Memory(location=None, verbose=0),
+        memory_level=0,
+        **kwargs,
+    ):
         if mask is not None:
             mask = get_masker(mask)
         self.masker = mask
+        self.memory = memory
+        self.memory_level = memory_level
 
         # Identify any kwargs
         kernel_args = {k: v for k, v in kwargs.items() if k.startswith("kernel__")}
@@ -190,6 +220,10 @@ class CBMAEstimator(Estimator):
     def _collect_ma_maps(self, coords_key="coordinates", maps_key="ma_maps"):
         """Collect modeled activation maps from Estimator inputs.
 
+        .. versionchanged:: 0.1.2
+
+            * MA maps are cached when ``memory`` is set and ``memory_level`` is at least 1.
+
         Parameters
         ----------
         coords_key : :obj:`str`, optional
@@ -210,11 +244,18 @@ class CBMAEstimator(Estimator):
         """
         LGR.debug(f"Generating MA maps from coordinates ({coords_key}).")
 
-        ma_maps = self.kernel_transformer.transform(
-            self.inputs_[coords_key],
-            masker=self.masker,
-            return_type="sparse",
-        )
+        transform = self._cache(self.kernel_transformer.transform, func_memory_level=1)
+
+        masker = self.masker
+        if self.memory_level >= 1:
+            # The masker's state changes as it is used (e.g., cached mask data), which would change
+            # its hash, so a fresh copy is passed to the cached function instead.
+            mask_img = masker.mask_img
+            masker = get_masker(
+                nib.Nifti1Image(mask_img.get_fdata(), mask_img.affine, mask_img.header)
+            )
+
+        ma_maps = transform(self.inputs_[coords_key], masker=masker, return_type="sparse")
 
         return ma_maps
 
@@ -509,25 +550,27 @@ class CBMAEstimator(Estimator):
             "histweights_level-voxel_corr-fwe_method-montecarlo"
         ] = histweights
 
-    def _correct_fwe_montecarlo_permutation(
+    def _correct_fwe_montecarlo_permutations(
         self,
-        iter_xyz,
+        iter_xyzs,
         iter_df,
         conn,
         voxel_thresh,
         vfwe_only,
     ):
-        """Run a single Monte Carlo permutation of a dataset.
+        """Run a batch of Monte Carlo permutations of a dataset.
 
         Does the shared work between vFWE and cFWE.
 
+        .. versionadded:: 0.1.2
+
         Parameters
         ----------
-        iter_xyz : :obj:`numpy.ndarray` of shape (C, 3)
-            The permuted coordinates. One row for each peak.
-            Columns correspond to x, y, and z coordinates.
+        iter_xyzs : :obj:`numpy.ndarray` of shape (C, B, 3)
+            The permuted coordinates for the B permutations in the batch. One row for each peak.
+            The last dimension corresponds to x, y, and z coordinates.
         iter_df : :obj:`pandas.DataFrame`
-            The coordinates DataFrame, to be filled with the permuted coordinates in ``iter_xyz``
+            The coordinates DataFrame, to be filled with the permuted coordinates in ``iter_xyzs``
             before permutation MA maps are generated.
         conn : :obj:`numpy.ndarray` of shape (3, 3, 3)
             The 3D structuring array for labeling clusters.
@@ -538,35 +581,42 @@ class CBMAEstimator(Estimator):
 
         Returns
         -------
-        (iter_max value, iter_max_cluster, iter_max_mass)
-            A 3-tuple of floats giving the maximum voxel-wise value, maximum cluster size,
-            and maximum cluster mass for the permuted dataset.
-            If ``vfwe_only`` is True, the latter two values will be None.
+        iter_max_values, iter_max_sizes, iter_max_masses : :obj:`numpy.ndarray` of shape (B,)
+            The maximum voxel-wise value, maximum cluster size, and maximum cluster mass for each
+            permuted dataset in the batch.
+            If ``vfwe_only`` is True, the latter two arrays will be None.
         """
+        n_iters = iter_xyzs.shape[1]
+
+        # The DataFrame and the 3D array for cluster labeling are shared across the batch
         iter_df = iter_df.copy()
+        mask_data = self.masker.mask_img.get_fdata().astype(bool)
+        iter_ss_map_3d = np.zeros(mask_data.shape)
 
-        iter_xyz = np.squeeze(iter_xyz)
-        iter_df[["x", "y", "z"]] = iter_xyz
+        iter_max_values = np.empty(n_iters)
+        iter_max_sizes = None if vfwe_only else np.empty(n_iters)
+        iter_max_masses = None if vfwe_only else np.empty(n_iters)
+        for i_iter in range(n_iters):
+            iter_df[["x", "y", "z"]] = iter_xyzs[:, i_iter, :]
 
-        iter_ma_maps = self.kernel_transformer.transform(
-            iter_df, masker=self.masker, return_type="sparse"
-        )
-        iter_ss_map = self._compute_summarystat(iter_ma_maps)
+            iter_ma_maps = self.kernel_transformer.transform(
+                iter_df, masker=self.masker, return_type="sparse"
+            )
+            iter_ss_map = self._compute_summarystat(iter_ma_maps)
 
-        del iter_ma_maps
+            del iter_ma_maps
 
-        # Voxel-level inference
-        iter_max_value = np.max(iter_ss_map)
+            # Voxel-level inference
+            iter_max_values[i_iter] = np.max(iter_ss_map)
 
-        if vfwe_only:
-            iter_max_size, iter_max_mass = None, None
-        else:
-            # Cluster-level inference
-            iter_ss_map = self.masker.inverse_transform(iter_ss_map).get_fdata()
-            iter_max_size, iter_max_mass = _calculate_cluster_measures(
-                iter_ss_map, voxel_thresh, conn, tail="upper"
-            )
-        return iter_max_value, iter_max_size, iter_max_mass
+            if not vfwe_only:
+                # Cluster-level inference
+                iter_ss_map_3d[mask_data] = iter_ss_map
+                iter_max_sizes[i_iter], iter_max_masses[i_iter] = _calculate_cluster_measures(
+                    iter_ss_map_3d, voxel_thresh, conn, tail="upper"
+                )
+
+        return iter_max_values, iter_max_sizes, iter_max_masses
 
     def correct_fwe_montecarlo(
         self,
@@ -575,11 +625,18 @@ class CBMAEstimator(Estimator):
         n_iters=10000,
         n_cores=1,
         vfwe_only=False,
+        null_distributions=None,
     ):
         """Perform FWE correction using the max-value permutation method.
 
         Only call this method from within a Corrector.
 
+        .. versionchanged:: 0.1.2
+
+            * Run the Monte Carlo iterations in batches, rather than one at a time.
+            * Add the ``null_distributions`` parameter, to reuse the null distributions from a
+              previous correction.
+
         .. versionchanged:: 0.0.13
 
             Change cluster neighborhood from faces+edges to faces, to match Nilearn.
@@ -609,6 +666,14 @@ class CBMAEstimator(Estimator):
             If True, only calculate the voxel-level FWE-corrected maps. Voxel-level correction
             can be performed very quickly if the Estimator's ``null_method`` was "montecarlo".
             Default is False.
+        null_distributions : :obj:`dict` or None, optional
+            Precomputed Monte Carlo FWE null distributions to use instead of running the
+            simulations, such as the ``null_distributions_`` attribute of the Estimator from a
+            previous call to this method.
+            They must have been generated from the same fitted Estimator with the same
+            ``voxel_thresh`` and ``vfwe_only``, and contain ``n_iters`` values each.
+            If None, the null distributions are always simulated from the current random state.
+            Default is None.
 
         Returns
         -------
@@ -680,40 +745,100 @@ class CBMAEstimator(Estimator):
                     "Running permutations from scratch."
                 )
 
-            null_xyz = vox2mm(
-                np.vstack(np.where(self.masker.mask_img.get_fdata())).T,
-                self.masker.mask_img.affine,
-            )
-
-            n_cores = _check_ncores(n_cores)
-
             # Identify summary statistic corresponding to intensity threshold
             ss_thresh = self._p_to_summarystat(voxel_thresh)
 
-            rand_idx = np.random.choice(
-                null_xyz.shape[0],
-                size=(self.inputs_["coordinates"].shape[0], n_iters),
-            )
-            rand_xyz = null_xyz[rand_idx, :]
-            iter_xyzs = np.split(rand_xyz, rand_xyz.shape[1], axis=1)
-            iter_df = self.inputs_["coordinates"].copy()
-
             # Define connectivity matrix for cluster labeling
             conn = ndimage.generate_binary_structure(rank=3, connectivity=1)
 
-            with tqdm_joblib(tqdm(total=n_iters)):
-                perm_results = Parallel(n_jobs=n_cores)(
-                    delayed(self._correct_fwe_montecarlo_permutation)(
-                        iter_xyzs[i_iter],
-                        iter_df=iter_df,
-                        conn=conn,
-                        voxel_thresh=ss_thresh,
-                        vfwe_only=vfwe_only,
+            fwe_keys = ["values_level-voxel_corr-fwe_method-montecarlo"]
+            if not vfwe_only:
+                fwe_keys += [
+                    "values_desc-size_level-cluster_corr-fwe_method-montecarlo",
+                    "values_desc-mass_level-cluster_corr-fwe_method-montecarlo",
+                ]
+
+            if null_distributions is not None:
+                missing_keys = [k for k in fwe_keys if k not in null_distributions]
+                if missing_keys:
+                    raise ValueError(
+                        "The provided null_distributions are missing the following keys: "
+                        f"{', '.join(missing_keys)}"
+                    )
+
+                bad_keys = [k for k in fwe_keys if np.shape(null_distributions[k]) != (n_iters,)]
+                if bad_keys:
+                    raise ValueError(
+                        f"The provided null_distributions must have {n_iters} values "
+                        f"(n_iters), but the following do not: {', '.join(bad_keys)}"
                     )
-                    for i_iter in range(n_iters)
+
+                LGR.info("Using precalculated null distributions for Monte Carlo FWE correction.")
+                fwe_voxel_max = null_distributions[fwe_keys[0]]
+                if not vfwe_only:
+                    fwe_cluster_size_max = null_distributions[fwe_keys[1]]
+                    fwe_cluster_mass_max = null_distributions[fwe_keys[2]]
+            else:
+                null_xyz = vox2mm(
+                    np.vstack(np.where(self.masker.mask_img.get_fdata())).T,
+                    self.masker.mask_img.affine,
                 )
 
-            fwe_voxel_max, fwe_cluster_size_max, fwe_cluster_mass_max = zip(*perm_results)
+                n_cores = _check_ncores(n_cores)
+
+                n_foci = self.inputs_["coordinates"].shape[0]
+
+                # Dispatch the permutations to the workers in batches, to reduce the overhead
+                # of sending the Estimator and the coordinates DataFrame to a worker for every
+                # single permutation.
+                # NOTE: Process-based workers are used on purpose. Most of each permutation is
+                # spent generating MA maps, which loops over foci in Python and would not run
+                # concurrently in threads. Large arrays are memory-mapped by joblib rather than
+                # copied.
+                n_batches = min(n_iters, max(n_cores, int(np.ceil(n_iters / 32))))
+                iter_idx_batches = np.array_split(np.arange(n_iters), n_batches)
+                iter_df = self.inputs_["coordinates"].copy()
+
+                # Each permutation draws its coordinates from an independent random Generator,
+                # so the null distributions do not depend on how the permutations are batched.
+                # The root seed comes from NumPy's global random state, so that seeding it with
+                # np.random.seed still makes the correction reproducible.
+                seed_seq = np.random.SeedSequence(np.random.randint(np.iinfo(np.int32).max))
+                iter_seeds = seed_seq.spawn(n_iters)
+
+                def _draw_xyzs(iter_idx):
+                    return np.stack(
+                        [
+                            null_xyz[
+                                np.random.default_rng(iter_seeds[i_iter]).integers(
+                                    null_xyz.shape[0], size=n_foci
+                                )
+                            ]
+                            for i_iter in iter_idx
+                        ],
+                        axis=1,
+                    )
+
+                # Only the maximum statistics are kept from each permutation, so the random
+                # coordinates are drawn lazily, one batch at a time, as batches are dispatched.
+                # This keeps memory use independent of the number of iterations.
+                with tqdm_joblib(tqdm(total=n_batches)):
+                    perm_results = Parallel(n_jobs=n_cores)(
+                        delayed(self._correct_fwe_montecarlo_permutations)(
+                            _draw_xyzs(iter_idx),
+                            iter_df=iter_df,
+                            conn=conn,
+                            voxel_thresh=ss_thresh,
+                            vfwe_only=vfwe_only,
+                        )
+                        for iter_idx in iter_idx_batches
+                    )
+
+                fwe_voxel_max, fwe_cluster_size_max, fwe_cluster_mass_max = zip(*perm_results)
+                fwe_voxel_max = np.concatenate(fwe_voxel_max)
+                if not vfwe_only:
+                    fwe_cluster_size_max = np.concatenate(fwe_cluster_size_max)
+                    fwe_cluster_mass_max = np.concatenate(fwe_cluster_mass_max)
 
             if not vfwe_only:
                 # Cluster-level FWE
@@ -721,7 +846,7 @@ class CBMAEstimator(Estimator):
                 # cluster-label
                 thresh_stat_values = self.masker.inverse_transform(stat_values).get_fdata()
                 thresh_stat_values[thresh_stat_values <= ss_thresh] = 0
-                labeled_matrix, _ = ndimage.label(thresh_stat_values, conn)
+                labeled_matrix, _ = ndimage.label(thresh_stat_values > 0, conn)
 
                 cluster_labels, idx, cluster_sizes = np.unique(
                     labeled_matrix,
@@ -731,13 +856,11 @@ class CBMAEstimator(Estimator):
                 assert cluster_labels[0] == 0
 
                 # Cluster mass-based inference
-                cluster_masses = np.zeros(cluster_labels.shape)
-                for i_val in cluster_labels:
-                    if i_val == 0:
-                        cluster_masses[i_val] = 0
-
-                    cluster_mass = np.sum(thresh_stat_values[labeled_matrix == i_val] - ss_thresh)
-                    cluster_masses[i_val] = cluster_mass
+                # Cluster labels are consecutive, so all masses can be summed in a single pass
+                cluster_masses = np.bincount(
+                    labeled_matrix.ravel(),
+                    weights=(thresh_stat_values - ss_thresh).ravel(),
+                )
 
                 p_cmfwe_vals = null_to_p(cluster_masses, fwe_cluster_mass_max, "upper")
                 p_cmfwe_map = p_cmfwe_vals[np.reshape(idx, labeled_matrix.shape)]
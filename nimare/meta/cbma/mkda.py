@@ -675,13 +675,11 @@ class MKDAChi2(PairwiseCBMAEstimator):
         assert cluster_labels[0] == 0
 
         # Cluster mass-based inference
-        cluster_masses = np.zeros(cluster_labels.shape)
-        for i_val in cluster_labels:
-            if i_val == 0:
-                cluster_masses[i_val] = 0
-
-            cluster_mass = np.sum(np.abs(stat_map_thresh[labeled_matrix == i_val]) - voxel_thresh)
-            cluster_masses[i_val] = cluster_mass
+        # Cluster labels are consecutive, so all masses can be summed in a single pass
+        cluster_masses = np.bincount(
+            labeled_matrix.ravel(),
+            weights=(np.abs(stat_map_thresh) - voxel_thresh).ravel(),
+        )
 
         p_cmfwe_vals = null_to_p(cluster_masses, cmfwe_null, tail="upper")
         p_cmfwe_map = p_cmfwe_vals[np.reshape(idx, labeled_matrix.shape)]
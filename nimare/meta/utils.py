@@ -5,6 +5,7 @@ import warnings
 import numpy as np
 import sparse
 from scipy import ndimage
+from scipy import sparse as sp_sparse
 
 from nimare.utils import unique_rows
 
@@ -158,6 +159,11 @@ def compute_ale_ma(mask, ijks, kernel=None, exp_idx=None, sample_sizes=None, use
     accounts for foci which are near to one another and may have overlapping
     kernels.
 
+    .. versionchanged:: 0.1.2
+
+        * Kernels are only applied within the bounding box of each experiment's foci,
+          instead of the whole volume.
+
     .. versionchanged:: 0.0.12
 
         * This function now returns a 4D sparse array.
@@ -240,7 +246,16 @@ def compute_ale_ma(mask, ijks, kernel=None, exp_idx=None, sample_sizes=None, use
 
         mid = int(np.floor(kernel.shape[0] / 2.0))
         mid1 = mid + 1
-        ma_values = np.zeros(shape)
+
+        # Only fill the bounding box of the experiment's kernels, rather than the whole volume
+        if ijk.shape[0]:
+            box_min = np.clip(ijk.min(axis=0) - mid, 0, shape)
+            box_max = np.clip(ijk.max(axis=0) + mid1, box_min, shape)
+        else:
+            box_min = box_max = np.zeros(3, dtype=int)
+        box = tuple(slice(lo, hi) for lo, hi in zip(box_min, box_max))
+        ijk = ijk - box_min
+        ma_values = np.zeros(box_max - box_min)
         for j_peak in range(ijk.shape[0]):
             i, j, k = ijk[j_peak, :]
             xl = max(i - mid, 0)
@@ -274,11 +289,11 @@ def compute_ale_ma(mask, ijks, kernel=None, exp_idx=None, sample_sizes=None, use
                     ma_values[xl:xh, yl:yh, zl:zh], kernel[xlk:xhk, ylk:yhk, zlk:zhk]
                 )
         # Set voxel outside the mask to zero.
-        ma_values[~mask_data] = 0
+        ma_values[~mask_data[box]] = 0
         nonzero_idx = np.where(ma_values > 0)
 
         all_exp.append(np.full(nonzero_idx[0].shape[0], i_exp))
-        all_coords.append(np.vstack(nonzero_idx))
+        all_coords.append(np.vstack(nonzero_idx) + box_min[:, None])
         all_data.append(ma_values[nonzero_idx])
 
     exp = np.hstack(all_exp)
@@ -324,6 +339,120 @@ def get_ale_kernel(img, sample_size=None, fwhm=None):
     return sigma_vox, kernel
 
 
+def _sparse_to_masked_dense(ma_maps, mask_data, dtype=None):
+    """Convert 4D sparse MA maps to a dense 2D array of in-mask voxels.
+
+    This avoids densifying the full (n_studies, X, Y, Z) array, which can be very large.
+
+    Parameters
+    ----------
+    ma_maps : :obj:`sparse._coo.core.COO`
+        4D sparse array of shape (n_studies, X, Y, Z) with MA maps.
+    mask_data : :obj:`numpy.ndarray` of shape (X, Y, Z)
+        Boolean mask array.
+    dtype : :obj:`numpy.dtype` or None, optional
+        Data type of the output array. If None, the data type of ``ma_maps`` is used.
+        Default is None.
+
+    Returns
+    -------
+    ma_values : :obj:`numpy.ndarray` of shape (n_studies, n_mask_voxels)
+        Dense array of MA values, with voxels ordered as in ``mask_data[mask_data]``.
+    """
+    mask_data = mask_data.astype(bool)
+    dtype = ma_maps.dtype if dtype is None else dtype
+
+    # Map each flattened voxel index to its column in the masked array (-1 if outside the mask)
+    voxel_idx = np.full(mask_data.size, -1, dtype=np.intp)
+    voxel_idx[np.flatnonzero(mask_data)] = np.arange(np.count_nonzero(mask_data))
+
+    flat_idx = np.ravel_multi_index(tuple(ma_maps.coords[1:]), mask_data.shape)
+    col_idx = voxel_idx[flat_idx]
+    keep = col_idx >= 0
+
+    ma_values = np.zeros((ma_maps.shape[0], np.count_nonzero(mask_data)), dtype=dtype)
+    ma_values[ma_maps.coords[0, keep], col_idx[keep]] = ma_maps.data[keep]
+
+    return ma_values
+
+
+def _sparse_to_masked_log_complement(ma_maps, mask_data):
+    """Convert 4D sparse MA maps to a sparse 2D array of ``log(1 - MA)`` for in-mask voxels.
+
+    The log values are rounded to a grid of multiples of a power of two. The grid is fine enough
+    to preserve double-precision ALE values, but coarse enough for any sum of the log values to
+    be exact in double precision. Sums over a given set of studies are therefore bit-identical,
+    regardless of the order in which they are computed.
+
+    Parameters
+    ----------
+    ma_maps : :obj:`sparse._coo.core.COO`
+        4D sparse array of shape (n_studies, X, Y, Z) with MA maps.
+    mask_data : :obj:`numpy.ndarray` of shape (X, Y, Z)
+        Boolean mask array.
+
+    Returns
+    -------
+    log_ma_arr : :obj:`scipy.sparse.csc_matrix` of shape (n_studies, n_mask_voxels)
+        Sparse array of ``log(1 - MA)`` values, with voxels ordered as in
+        ``mask_data[mask_data]``.
+    """
+    mask_data = mask_data.astype(bool)
+    n_mask_voxels = np.count_nonzero(mask_data)
+
+    # Map each flattened voxel index to its column in the masked array (-1 if outside the mask)
+    voxel_idx = np.full(mask_data.size, -1, dtype=np.intp)
+    voxel_idx[np.flatnonzero(mask_data)] = np.arange(n_mask_voxels)
+
+    flat_idx = np.ravel_multi_index(tuple(ma_maps.coords[1:]), mask_data.shape)
+    col_idx = voxel_idx[flat_idx]
+    keep = col_idx >= 0
+
+    # MA values of one would produce -inf, so clip them just below one
+    ma_values = np.minimum(ma_maps.data[keep].astype(np.float64), 1 - np.finfo(np.float64).eps)
+    log_ma_arr = sp_sparse.csc_matrix(
+        (np.log1p(-ma_values), (ma_maps.coords[0, keep], col_idx[keep])),
+        shape=(ma_maps.shape[0], n_mask_voxels),
+    )
+
+    # All log values are non-positive, so any partial sum is bounded by the largest total.
+    # With a grid step of 2 ** (exponent - 50), every sum is an integer number of steps well below
+    # 2 ** 53, and can be represented exactly.
+    max_abs_sum = -log_ma_arr.sum(axis=0).min()
+    if max_abs_sum > 0:
+        _, exponent = np.frexp(max_abs_sum)
+        step = np.ldexp(1.0, exponent - 50)
+        log_ma_arr.data = np.rint(log_ma_arr.data / step) * step
+
+    return log_ma_arr
+
+
+def _sparse_ale(ma_maps, mask_data):
+    """Compute ALE values from 4D sparse MA maps.
+
+    ALE values are computed as ``1 - prod(1 - MA)`` across studies, which is evaluated as a sum of
+    ``log(1 - MA)`` over the non-zero MA values only.
+
+    Parameters
+    ----------
+    ma_maps : :obj:`sparse._coo.core.COO`
+        4D sparse array of shape (n_studies, X, Y, Z) with MA maps.
+    mask_data : :obj:`numpy.ndarray` of shape (X, Y, Z)
+        Boolean mask array.
+
+    Returns
+    -------
+    stat_values : :obj:`numpy.ndarray` of shape (n_mask_voxels,)
+        ALE values, with voxels ordered as in ``mask_data[mask_data]``.
+    """
+    mask_data = mask_data.astype(bool)
+
+    flat_idx = np.ravel_multi_index(tuple(ma_maps.coords[1:]), mask_data.shape)
+    log_sum = np.bincount(flat_idx, weights=np.log1p(-ma_maps.data), minlength=mask_data.size)
+
+    return -np.expm1(log_sum[mask_data.reshape(-1)])
+
+
 def _get_last_bin(arr1d):
     """Index the last location in a 1D array with a non-zero value."""
     if np.any(arr1d):
@@ -359,7 +488,6 @@ def _calculate_cluster_measures(arr3d, threshold, conn, tail="upper"):
     else:
         arr3d[np.abs(arr3d) <= threshold] = 0
 
-    labeled_arr3d = np.empty(arr3d.shape, int)
     labeled_arr3d, _ = ndimage.label(arr3d > 0, conn)
 
     if tail == "two":
@@ -370,14 +498,13 @@ def _calculate_cluster_measures(arr3d, threshold, conn, tail="upper"):
         labeled_arr3d = labeled_arr3d + temp_labeled_arr3d
         del temp_labeled_arr3d
 
-    clust_sizes = np.bincount(labeled_arr3d.flatten())
-    clust_vals = np.arange(0, clust_sizes.shape[0])
+    labeled_arr3d = labeled_arr3d.ravel()
+    clust_sizes = np.bincount(labeled_arr3d)
 
     # Cluster mass-based inference
-    max_mass = 0
-    for unique_val in clust_vals[1:]:
-        ss_vals = np.abs(arr3d[labeled_arr3d == unique_val]) - threshold
-        max_mass = np.maximum(max_mass, np.sum(ss_vals))
+    # Cluster labels are consecutive, so all masses can be summed in a single pass
+    clust_masses = np.bincount(labeled_arr3d, weights=(np.abs(arr3d) - threshold).ravel())
+    max_mass = np.max(clust_masses[1:], initial=0)
 
     # Cluster size-based inference
     clust_sizes = clust_sizes[1:]  # First cluster is zeros in matrix
@@ -23,6 +23,7 @@
 #     limitations under the License.
 """Reports builder for NiMARE's MetaResult object."""
 import textwrap
+from concurrent.futures import ThreadPoolExecutor
 from glob import glob
 from pathlib import Path
 
@@ -50,6 +51,7 @@ PARAMETERS_DICT = {
     "null_method": "Null method",
     "n_iters": "Number of iterations",
     "n_cores": "Number of cores",
+    "device": "Device",
     "fwe": "Family-wise error rate (FWE) correction",
     "fdr": "False discovery rate (FDR) correction",
     "method": "Method",
@@ -265,12 +267,26 @@ def _gen_fig_summary(img_key, threshold, out_filename):
     (out_filename).write_text(summary_text, encoding="UTF-8")
 
 
-def _gen_figures(results, img_key, diag_name, threshold, fig_dir):
-    """Generate html and png objects for the report."""
+def _gen_figures(results, img_key, diag_name, threshold, fig_dir, executor):
+    """Generate html and png objects for the report.
+
+    The interactive html figures do not rely on pyplot's global state, so they are submitted to
+    ``executor`` and generated while the png figures are plotted in the calling thread.
+    The futures of the submitted figures are returned.
+    """
+    futures = []
+
     # Plot brain images if not empty
     if (results.maps[img_key] > threshold).any():
         img = results.get_map(img_key)
-        plot_interactive_brain(img, fig_dir / "corrector_figure-interactive.html", threshold)
+        futures.append(
+            executor.submit(
+                plot_interactive_brain,
+                img,
+                fig_dir / "corrector_figure-interactive.html",
+                threshold,
+            )
+        )
         plot_static_brain(img, fig_dir / "corrector_figure-static.png", threshold)
     else:
         _no_maps_found(fig_dir / "corrector_figure-non.html")
@@ -311,14 +327,16 @@ def _gen_figures(results, img_key, diag_name, threshold, fig_dir):
                 heatmap_names.append(f"diagnostics_diag-{diag_name}_tab-counts_figure.html")
 
         # Plot heatmaps
-        [
-            plot_heatmap(contribution_table, fig_dir / heatmap_name)
+        futures += [
+            executor.submit(plot_heatmap, contribution_table, fig_dir / heatmap_name)
             for heatmap_name, contribution_table in zip(heatmap_names, contribution_tables)
         ]
 
     else:
         _no_clusts_found(fig_dir / "diagnostics_tab-clust_table.html")
 
+    return futures
+
 
 class Element(object):
     """Just a basic component of a report."""
@@ -481,14 +499,24 @@ class Report:
 
         _gen_est_summary(self.results.estimator, self.fig_dir / "estimator_summary.html")
         _gen_cor_summary(self.results.corrector, self.fig_dir / "corrector_summary.html")
-        for diagnostic in self.results.diagnostics:
-            img_key = diagnostic.target_image
-            diag_name = diagnostic.__class__.__name__
-            threshold = diagnostic.voxel_thresh
-
-            _gen_fig_summary(img_key, threshold, self.fig_dir / "corrector_figure-summary.html")
-            _gen_diag_summary(diagnostic, self.fig_dir / "diagnostics_summary.html")
-            _gen_figures(self.results, img_key, diag_name, threshold, self.fig_dir)
+        with ThreadPoolExecutor() as executor:
+            for diagnostic in self.results.diagnostics:
+                img_key = diagnostic.target_image
+                diag_name = diagnostic.__class__.__name__
+                threshold = diagnostic.voxel_thresh
+
+                _gen_fig_summary(
+                    img_key, threshold, self.fig_dir / "corrector_figure-summary.html"
+                )
+                _gen_diag_summary(diagnostic, self.fig_dir / "diagnostics_summary.html")
+                futures = _gen_figures(
+                    self.results, img_key, diag_name, threshold, self.fig_dir, executor
+                )
+
+                # Diagnostics share figure file names, so finish (and raise any error from) this
+                # diagnostic's figures before moving on to the next one
+                for future in futures:
+                    future.result()
 
         # Default template from nimare
         self.template_path = Path(pkgrf("nimare", "reports/report.tpl"))
@@ -112,6 +112,10 @@ def pearson(x, y):
 def null_to_p(test_value, null_array, tail="two", symmetric=False):
     """Return p-value for test value(s) against null array.
 
+    .. versionchanged:: 0.1.2
+
+        * Support a 2D ``null_array``, with one null distribution for each test value.
+
     .. versionchanged:: 0.0.7
 
         * [FIX] Add parameter *symmetric*.
@@ -120,8 +124,10 @@ def null_to_p(test_value, null_array, tail="two", symmetric=False):
     ----------
     test_value : 1D array_like
         Values for which to determine p-value.
-    null_array : 1D array_like
+    null_array : 1D or 2D array_like
         Null distribution against which test_value is compared.
+        If 2D, it must have shape (I x V), with one null distribution of I values for each of
+        the V test values.
     tail : {'two', 'upper', 'lower'}, optional
         Whether to compare value against null distribution in a two-sided
         ('two') or one-sided ('upper' or 'lower') manner.
@@ -157,18 +163,23 @@ def null_to_p(test_value, null_array, tail="two", symmetric=False):
     return_first = isinstance(test_value, (float, int))
     test_value = np.atleast_1d(test_value)
     null_array = np.array(null_array)
+    voxelwise_null = null_array.ndim == 2
 
     # For efficiency's sake, if there are more than 1000 values, pass only the unique
     # values through percentileofscore(), and then reconstruct.
-    if len(test_value) > 1000:
+    if (len(test_value) > 1000) and not voxelwise_null:
         reconstruct = True
         test_value, uniq_idx = np.unique(test_value, return_inverse=True)
     else:
         reconstruct = False
 
     def compute_p(t, null):
-        null = np.sort(null)
-        idx = np.searchsorted(null, t, side="left").astype(float)
+        if voxelwise_null:
+            # Count the null values below each test value in its own null distribution
+            idx = np.sum(null < t, axis=0).astype(float)
+        else:
+            null = np.sort(null)
+            idx = np.searchsorted(null, t, side="left").astype(float)
         return 1 - idx / len(null)
 
     if tail == "two":
@@ -262,8 +273,7 @@ def nullhist_to_p(test_values, histogram_weights, histogram_bins):
     # Get p-values by getting the value_bins-th value in null_distribution
     if voxelwise_null:
         # Pair each test value with its associated null distribution
-        for i_voxel, voxel_idx in enumerate(idx):
-            p_values[voxel_idx] = null_distribution[value_bins[i_voxel], voxel_idx]
+        p_values[idx] = null_distribution[value_bins, idx]
     else:
         p_values[idx] = null_distribution[value_bins]
 
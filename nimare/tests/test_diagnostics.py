@@ -1,6 +1,7 @@
 """Tests for the nimare.diagnostics module."""
 import os.path as op
 
+import numpy as np
 import pytest
 from nilearn.input_data import NiftiLabelsMasker
 
@@ -81,6 +82,23 @@ def test_jackknife_with_zero_clusters(testdata_cbma_full):
     assert not label_maps
 
 
+def test_jackknife_leave_one_out_ale(testdata_cbma_full):
+    """Ensure that leave-one-out ALE values match those from refitting the ALE."""
+    dset = testdata_cbma_full.slice(testdata_cbma_full.ids[:10])
+    meta = cbma.ALE()
+    res = meta.fit(dset)
+
+    expid = meta.inputs_["id"][0]
+    jackknife = diagnostics.Jackknife(target_image="z", voxel_thresh=1.65)
+    loo_stat_values = jackknife._leave_one_out_ale(
+        meta, expid, res.get_map("stat", return_type="array")
+    )
+
+    other_ids = [id_ for id_ in meta.inputs_["id"] if id_ != expid]
+    temp_res = cbma.ALE().fit(dset.slice(other_ids))
+    assert np.allclose(loo_stat_values, temp_res.get_map("stat", return_type="array"))
+
+
 def test_jackknife_with_custom_masker_smoke(testdata_ibma):
     """Ensure that Jackknife will work with NiftiLabelsMaskers.
 
@@ -1,16 +1,25 @@
 """Test nimare.meta.ale (ALE/SCALE meta-analytic algorithms)."""
+import copy
 import os
 import pickle
+import sys
 
 import nibabel as nib
 import numpy as np
 import pytest
+import sparse
 from nilearn.input_data import NiftiLabelsMasker
 
 import nimare
 from nimare.correct import FDRCorrector, FWECorrector
 from nimare.meta import ale
+from nimare.meta.utils import (
+    _sparse_ale,
+    _sparse_to_masked_dense,
+    _sparse_to_masked_log_complement,
+)
 from nimare.results import MetaResult
+from nimare.stats import null_to_p
 from nimare.tests.utils import get_test_data_path
 from nimare.utils import vox2mm
 
@@ -233,6 +242,68 @@ def test_ALE_montecarlo_null_unit(testdata_cbma, tmp_path_factory):
     )
 
 
+def test_ALE_fwe_montecarlo_reuse(testdata_cbma):
+    """Check that Monte Carlo FWE null distributions are only reused when requested."""
+    results = ale.ALE(null_method="approximate").fit(testdata_cbma)
+    corr = FWECorrector(method="montecarlo", voxel_thresh=0.001, n_iters=5, n_cores=1)
+    np.random.seed(0)
+    corr_results = corr.transform(results)
+    null_dists = copy.deepcopy(corr_results.estimator.null_distributions_)
+
+    # Repeated corrections redraw the null distributions from the global random state
+    np.random.seed(1)
+    corr_results2 = corr.transform(corr_results)
+    assert not np.array_equal(
+        corr_results2.estimator.null_distributions_[
+            "values_level-voxel_corr-fwe_method-montecarlo"
+        ],
+        null_dists["values_level-voxel_corr-fwe_method-montecarlo"],
+    )
+
+    # Precomputed null distributions are reused when passed explicitly
+    corr = FWECorrector(
+        method="montecarlo",
+        voxel_thresh=0.001,
+        n_iters=5,
+        n_cores=1,
+        null_distributions=null_dists,
+    )
+    corr_results3 = corr.transform(results)
+    for key, value in null_dists.items():
+        assert np.array_equal(corr_results3.estimator.null_distributions_[key], value)
+    for key in corr_results.maps.keys():
+        assert np.array_equal(corr_results3.maps[key], corr_results.maps[key])
+
+    # The precomputed null distributions must match n_iters
+    corr = FWECorrector(
+        method="montecarlo",
+        voxel_thresh=0.001,
+        n_iters=6,
+        n_cores=1,
+        null_distributions=null_dists,
+    )
+    with pytest.raises(ValueError):
+        corr.transform(results)
+
+
+def test_ALE_fwe_montecarlo_seed(testdata_cbma, monkeypatch):
+    """Check that Monte Carlo FWE null distributions are reproducible across n_cores values."""
+    # Use the requested number of cores, even if the machine has fewer
+    monkeypatch.setattr(nimare.meta.cbma.base, "_check_ncores", lambda n_cores: n_cores)
+
+    results = ale.ALE(null_method="approximate").fit(testdata_cbma)
+    null_dists = []
+    for n_cores in [1, 2]:
+        np.random.seed(0)
+        estimator = copy.deepcopy(results.estimator)
+        estimator.correct_fwe_montecarlo(results, voxel_thresh=0.001, n_iters=6, n_cores=n_cores)
+        null_dists.append(
+            estimator.null_distributions_["values_level-voxel_corr-fwe_method-montecarlo"]
+        )
+
+    assert np.array_equal(null_dists[0], null_dists[1])
+
+
 def test_ALESubtraction_smoke(testdata_cbma, tmp_path_factory):
     """Smoke test for ALESubtraction."""
     tmpdir = tmp_path_factory.mktemp("test_ALESubtraction_smoke")
@@ -252,6 +323,133 @@ def test_ALESubtraction_smoke(testdata_cbma, tmp_path_factory):
     assert os.path.isfile(out_file)
 
 
+def test_ALESubtraction_permutations(testdata_cbma_full):
+    """Check ALESubtraction p-values against explicit per-permutation ALE differences."""
+    dset1 = testdata_cbma_full.slice(testdata_cbma_full.ids[:10])
+    dset2 = testdata_cbma_full.slice(testdata_cbma_full.ids[10:])
+    n_iters = 10
+
+    sub_meta = ale.ALESubtraction(n_iters=n_iters)
+    results = sub_meta.fit(dset1, dset2)
+    p_values = results.get_map("p_desc-group1MinusGroup2", return_type="array")
+
+    ma_maps1 = sub_meta._collect_ma_maps(maps_key="ma_maps1", coords_key="coordinates1")
+    ma_maps2 = sub_meta._collect_ma_maps(maps_key="ma_maps2", coords_key="coordinates2")
+    ma_arr = sparse.concatenate((ma_maps1, ma_maps2))
+    n_exps, n_grp1 = ma_arr.shape[0], ma_maps1.shape[0]
+
+    mask_data = sub_meta.masker.mask_img.get_fdata().astype(bool)
+    ma_values = _sparse_to_masked_dense(ma_arr, mask_data)
+    contributing = ma_values > 0
+
+    def _alediff(id_idx):
+        grp1_ale_values = 1.0 - np.prod(1.0 - ma_values[id_idx[:n_grp1]], axis=0)
+        grp2_ale_values = 1.0 - np.prod(1.0 - ma_values[id_idx[n_grp1:]], axis=0)
+        return grp1_ale_values - grp2_ale_values
+
+    obs_assignments = np.zeros(n_exps, dtype=bool)
+    obs_assignments[:n_grp1] = True
+    diff_values = _alediff(np.arange(n_exps))
+    assert np.allclose(
+        results.get_map("stat_desc-group1MinusGroup2", return_type="array"), diff_values
+    )
+
+    log_ma_arr = _sparse_to_masked_log_complement(ma_arr, mask_data)
+    obs_diff_values = sub_meta._compute_alediff(obs_assignments[None, :], log_ma_arr)[0]
+    iter_diff_values = np.zeros((n_iters, log_ma_arr.shape[1]))
+    sub_meta._run_permutations(np.arange(n_iters), n_grp1, log_ma_arr, iter_diff_values)
+
+    ref_iter_diff_values = np.zeros_like(iter_diff_values)
+    for i_iter in range(n_iters):
+        id_idx = np.random.default_rng(seed=i_iter).permutation(n_exps)
+        ref_iter_diff_values[i_iter] = _alediff(id_idx)
+        assert np.allclose(iter_diff_values[i_iter], ref_iter_diff_values[i_iter])
+
+        # Permutations that assign the experiments contributing to a voxel like the observed
+        # assignment must tie exactly with the observed difference
+        iter_assignments = np.zeros(n_exps, dtype=bool)
+        iter_assignments[id_idx[:n_grp1]] = True
+        same_voxels = ~np.any(
+            contributing & (iter_assignments != obs_assignments)[:, None], axis=0
+        )
+        assert np.array_equal(iter_diff_values[i_iter, same_voxels], obs_diff_values[same_voxels])
+
+    # With one or two contributing experiments, the product formula ties exactly as well, so the
+    # p-values must match those from the explicit null distributions
+    few_voxels = contributing.sum(axis=0) <= 2
+    assert np.any(contributing.sum(axis=0) == 1)
+    ref_p_values = null_to_p(
+        diff_values[few_voxels],
+        ref_iter_diff_values[:, few_voxels],
+        tail="two",
+        symmetric=False,
+    )
+    assert np.array_equal(p_values[few_voxels], ref_p_values)
+
+
+def test_sparse_ale(testdata_cbma):
+    """Check that ALE values from sparse MA maps match the dense product formula."""
+    meta = ale.ALE()
+    meta.fit(testdata_cbma)
+    ma_maps = meta._collect_ma_maps(coords_key="coordinates", maps_key="ma_maps")
+    mask_data = meta.masker.mask_img.get_fdata().astype(bool)
+
+    ma_values = _sparse_to_masked_dense(ma_maps, mask_data)
+    assert np.allclose(_sparse_ale(ma_maps, mask_data), 1.0 - np.prod(1.0 - ma_values, axis=0))
+
+
+def test_ALE_memory(testdata_cbma, tmp_path_factory):
+    """Check that cached MA maps are shared across ALE-family Estimators."""
+    tmpdir = tmp_path_factory.mktemp("test_ALE_memory")
+    dset1 = testdata_cbma.slice(testdata_cbma.ids[:10])
+    dset2 = testdata_cbma.slice(testdata_cbma.ids[10:])
+
+    results = ale.ALE().fit(dset1)
+    cached_results = ale.ALE(memory=str(tmpdir), memory_level=1).fit(dset1)
+    assert np.array_equal(
+        results.get_map("z", return_type="array"),
+        cached_results.get_map("z", return_type="array"),
+    )
+
+    cache_dir = os.path.join(tmpdir, "joblib", "nimare", "meta", "kernel")
+    cache_dir = os.path.join(cache_dir, "KernelTransformer", "transform")
+    n_cached = len([f for f in os.listdir(cache_dir) if not f.endswith(".py")])
+    assert n_cached == 1
+
+    # The subtraction analysis reuses the MA maps from dset1 and only adds those from dset2
+    sub_meta = ale.ALESubtraction(n_iters=5, memory=str(tmpdir), memory_level=1)
+    sub_meta.fit(dset1, dset2)
+    n_cached = len([f for f in os.listdir(cache_dir) if not f.endswith(".py")])
+    assert n_cached == 2
+
+    # With memory_level=2, the permutation-based p-values are cached as well
+    sub_results = ale.ALESubtraction(n_iters=5, memory=str(tmpdir), memory_level=2).fit(
+        dset1, dset2
+    )
+    cached_sub_results = ale.ALESubtraction(n_iters=5, memory=str(tmpdir), memory_level=2).fit(
+        dset1, dset2
+    )
+    assert np.array_equal(
+        sub_results.get_map("z_desc-group1MinusGroup2", return_type="array"),
+        cached_sub_results.get_map("z_desc-group1MinusGroup2", return_type="array"),
+    )
+
+    null_cache_dir = os.path.join(tmpdir, "joblib", "nimare", "meta", "cbma", "ale")
+    null_cache_dir = os.path.join(null_cache_dir, "ALESubtraction", "_compute_alediff_null_p")
+    n_cached = len([f for f in os.listdir(null_cache_dir) if not f.endswith(".py")])
+    assert n_cached == 1
+
+
+def test_ALESubtraction_device(testdata_cbma, monkeypatch):
+    """Check that ALESubtraction falls back to the CPU when CuPy is unavailable."""
+    monkeypatch.setitem(sys.modules, "cupy", None)
+
+    sub_meta = ale.ALESubtraction(n_iters=5, device="cuda")
+    assert sub_meta.device == "cpu"
+    results = sub_meta.fit(testdata_cbma, testdata_cbma)
+    assert "z_desc-group1MinusGroup2" in results.maps.keys()
+
+
 def test_SCALE_smoke(testdata_cbma, tmp_path_factory):
     """Smoke test for SCALE."""
     tmpdir = tmp_path_factory.mktemp("test_SCALE_smoke")
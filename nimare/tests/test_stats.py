@@ -69,6 +69,18 @@ def test_null_to_p_array():
     assert np.abs(p.var() - 1 / 12) < 0.02
 
 
+def test_null_to_p_voxelwise():
+    """Test nimare.stats.null_to_p with voxel-wise null distributions."""
+    n_iters, n_voxels = 100, 20
+    nulldist = np.random.normal(size=(n_iters, n_voxels))
+    t = np.random.normal(size=n_voxels)
+    for tail in ["two", "upper", "lower"]:
+        p = null_to_p(t, nulldist, tail=tail)
+        assert p.shape == (n_voxels,)
+        expected = [null_to_p(t[i], nulldist[:, i], tail=tail) for i in range(n_voxels)]
+        assert np.allclose(p, expected)
+
+
 def test_nullhist_to_p():
     """Test nimare.stats.nullhist_to_p."""
     n_voxels = 5